@@ -134,6 +134,13 @@ class Doc:
     words: List[Word] = None
     pipeline: "Pipeline" = None
     raw: str = None
+    # matrix of shape (number of words, embedding length), with one
+    # row per word in ``words``; filled in by ``EmbeddingsProcess``
+    embeddings: numpy.ndarray = None
+    # per-row dequantization scales, set only when ``EmbeddingsProcess``
+    # stores ``embeddings`` as int8; recover row i as
+    # ``embeddings[i].astype("float32") * embeddings_scales[i]``
+    embeddings_scales: numpy.ndarray = None
     embeddings_model = None
 
     @property
@@ -223,14 +230,6 @@ class Doc:
         """
         return self.words[word_index]
 
-    @property
-    def embeddings(self):
-        """Returns an embedding for each word.
-
-        TODO: Consider option to use lemma
-        """
-        return self._get_words_attribute("embedding")
-
 
 @dataclass
 class Process:
@@ -12,12 +12,21 @@ The Word2Vec models are in two versions, ``txt`` and ``bin``, with the
 ``txt`` being approximately twice the size and containing information
 for retraining.
 
+Models converted to a Magnitude-style SQLite store may be used through
+``MagnitudeEmbeddings``, which pages vectors in from disk on demand
+rather than loading a whole model into memory.
+
 # TODO: Classes ``Word2VecEmbeddings`` and ``FastTextEmbeddings`` contain duplicative code. Consider combining them.
 """
 
 import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List
 from zipfile import ZipFile
 
+import numpy as np
 import requests
 from gensim import models  # type: ignore
 from tqdm import tqdm
@@ -26,6 +35,40 @@ from cltkv1.core.exceptions import CLTKException, UnimplementedAlgorithmError
 from cltkv1.languages.utils import get_lang
 from cltkv1.utils import CLTK_DATA_DIR
 
+# max entries held by each backend's word-to-vector LRU cache; sized
+# to comfortably cover the frequent vocabulary of a corpus
+VECTOR_CACHE_SIZE = 50_000
+
+# max bound variables per SELECT issued by the SQLite backend; kept
+# well under SQLITE_MAX_VARIABLE_NUMBER, which is only 999 on SQLite
+# builds older than 3.32
+SQL_SELECT_CHUNK_SIZE = 500
+
+
+def _resolve_word_ids(vocab, words) -> np.ndarray:
+    """Map ``words`` to their integer row ids in a model's backing
+    matrix, with ``-1`` for words absent from ``vocab``. This is the
+    only remaining Python-level loop in the gensim-backed bulk
+    lookups, and it runs once per distinct word.
+    """
+    ids = np.empty(len(words), dtype=np.int64)
+    for position, word in enumerate(words):
+        entry = vocab.get(word)
+        ids[position] = -1 if entry is None else entry.index
+    return ids
+
+
+def _gather_rows_by_id(vectors, ids, out) -> None:
+    """Copy rows ``ids`` of backing matrix ``vectors`` into
+    preallocated ``out``, zeroing rows whose id is ``-1``. A pure
+    integer gather: the row copies and the OOV zeroing each happen in
+    a single vectorized NumPy call, with no per-row string handling.
+    """
+    missing = ids < 0
+    np.take(vectors, np.where(missing, 0, ids), axis=0, out=out)
+    if missing.any():
+        out[missing] = 0.0
+
 
 class Word2VecEmbeddings:
     """Wrapper for Word2Vec embeddings. Note: For models
@@ -38,6 +81,11 @@ class Word2VecEmbeddings:
     <class 'numpy.ndarray'>
     """
 
+    # bulk lookups resolve ids in a Python-level loop and gather with
+    # np.take, all of it holding the interpreter lock, so running them
+    # from several threads cannot help
+    PARALLEL_LOOKUPS = False
+
     def __init__(
         self,
         iso_code: str,
@@ -82,17 +130,103 @@ class Word2VecEmbeddings:
         self.model = (
             self._load_model()
         )  # type: models.keyedvectors.Word2VecKeyedVectors
+        self._dim = None  # type: int
+        self._vector_cache = OrderedDict()  # type: OrderedDict
 
     def get_word_vector(self, word: str):
-        """Return embedding array."""
+        """Return embedding array, or ``None`` for a word missing
+        from the model. Results are memoized in a bounded LRU cache
+        that persists across documents; the returned arrays are
+        read-only.
+        """
+        cache = self._vector_cache
+        if word in cache:
+            cache.move_to_end(word)
+            return cache[word]
         try:
-            return self.model.get_vector(word)
+            vector = self.model.get_vector(word)
+            vector = vector.view()
+            vector.flags.writeable = False
         except KeyError:
-            return None
+            vector = None
+        self._cache_put(word, vector)
+        return vector
+
+    def get_word_vectors(self, words: List[str]) -> np.ndarray:
+        """Return embedding arrays for all ``words`` in a single
+        matrix of shape ``(len(words), embedding_length)``. Rows
+        for words missing from the model are all zeros.
+
+        >>> from cltkv1.embeddings.embeddings import Word2VecEmbeddings
+        >>> embeddings_obj = Word2VecEmbeddings(iso_code="grc", interactive=False, overwrite=False, silent=True)
+        >>> vectors = embeddings_obj.get_word_vectors(["ἀρχή", "λόγος"])
+        >>> vectors.shape[0]
+        2
+        """
+        vector_matrix = np.empty(
+            (len(words), self.get_embedding_length()), dtype=np.float32
+        )
+        self.get_word_vectors_into(words, vector_matrix)
+        return vector_matrix
+
+    def get_word_vectors_into(self, words: List[str], out: np.ndarray) -> None:
+        """Fill the rows of preallocated matrix ``out``, of shape
+        ``(len(words), embedding_length)``, with the embedding of
+        each word. The words are resolved to integer rows of the
+        model's backing matrix, then copied with a single vectorized
+        gather; rows for words missing from the model are zeroed.
+        """
+        self.get_word_vectors_by_id(self.get_word_ids(words), out=out)
+
+    def get_word_ids(self, words: List[str]) -> np.ndarray:
+        """Resolve ``words`` to the integer row ids of the model's
+        backing matrix, with ``-1`` for out-of-vocabulary words.
+        Callers that look the same tokens up repeatedly can resolve
+        ids once and pass them to ``get_word_vectors_by_id``, skipping
+        all per-lookup string hashing.
+        """
+        return _resolve_word_ids(self.model.vocab, words)
+
+    def get_word_vectors_by_id(
+        self, ids: np.ndarray, out: np.ndarray = None
+    ) -> np.ndarray:
+        """Return the matrix of vectors for precomputed integer row
+        ids (as returned by ``get_word_ids``); rows for id ``-1`` are
+        zeroed. ``out``, if given, must be a preallocated
+        ``(len(ids), embedding_length)`` float32 matrix and is filled
+        and returned.
+        """
+        if out is None:
+            out = np.empty(
+                (len(ids), self.get_embedding_length()), dtype=np.float32
+            )
+        _gather_rows_by_id(self.model.vectors, ids, out)
+        return out
+
+    def _cache_put(self, word: str, vector) -> None:
+        """Insert a lookup result (an array, or ``None`` for a miss)
+        into the vector cache, evicting the least recently used entry
+        once the cache is full.
+        """
+        if len(self._vector_cache) >= VECTOR_CACHE_SIZE:
+            self._vector_cache.popitem(last=False)
+        self._vector_cache[word] = vector
+
+    def cache_clear(self) -> None:
+        """Empty the vector cache, e.g. under memory pressure."""
+        self._vector_cache.clear()
+
+    @property
+    def dim(self) -> int:
+        """The embedding length, read from the model once and then
+        cached, so repeated queries cost one attribute lookup."""
+        if self._dim is None:
+            self._dim = self.model.vector_size
+        return self._dim
 
     def get_embedding_length(self) -> int:
         """Return the embedding length for selected model."""
-        return self.model.vector_size
+        return self.dim
 
     def get_sims(self, word: str):
         """Get similar words."""
@@ -238,6 +372,11 @@ class FastTextEmbeddings:
     <class 'numpy.ndarray'>
     """
 
+    # bulk lookups resolve ids in a Python-level loop and gather with
+    # np.take, all of it holding the interpreter lock, so running them
+    # from several threads cannot help
+    PARALLEL_LOOKUPS = False
+
     def __init__(
         self,
         iso_code: str,
@@ -280,18 +419,104 @@ class FastTextEmbeddings:
             message = f"Model for '{self.iso_code}' / '{self.training_set}' / '{self.model_type}' already present at '{self.model_fp}' and ``overwrite=False``."
             # TODO: Log message
         self.model = self._load_model()
+        self._dim = None  # type: int
+        self._vector_cache = OrderedDict()  # type: OrderedDict
 
     def get_word_vector(self, word: str):
-        """Return embedding array."""
+        """Return embedding array, or ``None`` for a word missing
+        from the model. Results are memoized in a bounded LRU cache
+        that persists across documents; the returned arrays are
+        read-only.
+        """
+        cache = self._vector_cache
+        if word in cache:
+            cache.move_to_end(word)
+            return cache[word]
         try:
-            return self.model.get_vector(word)
+            vector = self.model.get_vector(word)
+            vector = vector.view()
+            vector.flags.writeable = False
         except KeyError:
             # TODO: To get an embedding from an OOV for sub-words, load the ``.bin`` file, too: `https://radimrehurek.com/gensim/models/fasttext.html#gensim.models.fasttext.load_facebook_model``_
-            return None
+            vector = None
+        self._cache_put(word, vector)
+        return vector
+
+    def get_word_vectors(self, words: List[str]) -> np.ndarray:
+        """Return embedding arrays for all ``words`` in a single
+        matrix of shape ``(len(words), embedding_length)``. Rows
+        for words missing from the model are all zeros.
+
+        >>> from cltkv1.embeddings.embeddings import FastTextEmbeddings
+        >>> embeddings_obj = FastTextEmbeddings(iso_code="lat", interactive=False, overwrite=False, silent=True)
+        >>> vectors = embeddings_obj.get_word_vectors(["amicitia", "amor"])
+        >>> vectors.shape[0]
+        2
+        """
+        vector_matrix = np.empty(
+            (len(words), self.get_embedding_length()), dtype=np.float32
+        )
+        self.get_word_vectors_into(words, vector_matrix)
+        return vector_matrix
+
+    def get_word_vectors_into(self, words: List[str], out: np.ndarray) -> None:
+        """Fill the rows of preallocated matrix ``out``, of shape
+        ``(len(words), embedding_length)``, with the embedding of
+        each word. The words are resolved to integer rows of the
+        model's backing matrix, then copied with a single vectorized
+        gather; rows for words missing from the model are zeroed.
+        """
+        self.get_word_vectors_by_id(self.get_word_ids(words), out=out)
+
+    def get_word_ids(self, words: List[str]) -> np.ndarray:
+        """Resolve ``words`` to the integer row ids of the model's
+        backing matrix, with ``-1`` for out-of-vocabulary words.
+        Callers that look the same tokens up repeatedly can resolve
+        ids once and pass them to ``get_word_vectors_by_id``, skipping
+        all per-lookup string hashing.
+        """
+        return _resolve_word_ids(self.model.vocab, words)
+
+    def get_word_vectors_by_id(
+        self, ids: np.ndarray, out: np.ndarray = None
+    ) -> np.ndarray:
+        """Return the matrix of vectors for precomputed integer row
+        ids (as returned by ``get_word_ids``); rows for id ``-1`` are
+        zeroed. ``out``, if given, must be a preallocated
+        ``(len(ids), embedding_length)`` float32 matrix and is filled
+        and returned.
+        """
+        if out is None:
+            out = np.empty(
+                (len(ids), self.get_embedding_length()), dtype=np.float32
+            )
+        _gather_rows_by_id(self.model.vectors, ids, out)
+        return out
+
+    def _cache_put(self, word: str, vector) -> None:
+        """Insert a lookup result (an array, or ``None`` for a miss)
+        into the vector cache, evicting the least recently used entry
+        once the cache is full.
+        """
+        if len(self._vector_cache) >= VECTOR_CACHE_SIZE:
+            self._vector_cache.popitem(last=False)
+        self._vector_cache[word] = vector
+
+    def cache_clear(self) -> None:
+        """Empty the vector cache, e.g. under memory pressure."""
+        self._vector_cache.clear()
+
+    @property
+    def dim(self) -> int:
+        """The embedding length, read from the model once and then
+        cached, so repeated queries cost one attribute lookup."""
+        if self._dim is None:
+            self._dim = self.model.vector_size
+        return self._dim
 
     def get_embedding_length(self) -> int:
         """Return the embedding length for selected model."""
-        return self.model.vector_size
+        return self.dim
 
     def get_sims(self, word: str):
         """Get similar words."""
@@ -537,3 +762,163 @@ class FastTextEmbeddings:
         except FileExistsError:
             # TODO: Log INFO level; it's OK if dir already exists
             return None
+
+
+class MagnitudeEmbeddings:
+    """Wrapper for embeddings converted to `Magnitude
+    <https://github.com/plasticityai/magnitude>`_-style SQLite stores.
+    Unlike ``Word2VecEmbeddings`` and ``FastTextEmbeddings``, which read
+    an entire vector file into RAM before the first lookup, an SQLite
+    store is memory-mapped by the database driver, so only the vectors
+    actually queried are paged in from disk. "Loading" such a model
+    takes well under a second and its resident memory stays proportional
+    to the number of distinct word types looked up.
+
+    The store is expected at
+    ``~/cltk_data/<iso_code>/embeddings/magnitude/model.magnitude`` and
+    must contain a table ``magnitude(key TEXT PRIMARY KEY, vector BLOB,
+    scale REAL)``, where ``vector`` holds the int8-quantized embedding
+    and ``scale`` its dequantization factor, plus a table
+    ``format(key TEXT, value TEXT)`` recording at least ``dim``, the
+    embedding length.
+    """
+
+    # sqlite3 releases the interpreter lock while a query runs, so
+    # bulk lookups genuinely overlap when issued from several threads
+    PARALLEL_LOOKUPS = True
+
+    def __init__(self, iso_code: str):
+        """Constructor for ``MagnitudeEmbeddings`` class. Opens the
+        SQLite store read-only; raises ``CLTKException`` if no
+        converted model is present for the language.
+        """
+        self.iso_code = iso_code
+        get_lang(self.iso_code)  # check if iso_code valid
+        self.model_fp = os.path.join(
+            CLTK_DATA_DIR, self.iso_code, "embeddings", "magnitude", "model.magnitude"
+        )
+        if not os.path.isfile(self.model_fp):
+            raise CLTKException(
+                f"No Magnitude store found at '{self.model_fp}'. Convert a vector file for '{self.iso_code}' and place it there."
+            )
+        # the store is opened read-only, so sharing the connection
+        # between threads (as the parallel bulk lookup does) is safe
+        self.db = sqlite3.connect(
+            f"file:{self.model_fp}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._embedding_length = int(
+            self.db.execute("SELECT value FROM format WHERE key = 'dim'").fetchone()[0]
+        )
+        self._zero_vector = None  # type: np.ndarray
+        self._vector_cache = OrderedDict()  # type: OrderedDict
+        # the parallel bulk lookup calls into this backend from pool
+        # threads; all cache reads and writes happen under this lock
+        self._cache_lock = threading.Lock()
+
+    def get_word_vector(self, word: str):
+        """Return embedding array, or ``None`` for a word missing
+        from the store. Results are memoized in a bounded LRU cache
+        that persists across documents; the returned arrays are
+        read-only.
+        """
+        with self._cache_lock:
+            cache = self._vector_cache
+            if word in cache:
+                cache.move_to_end(word)
+                return cache[word]
+        row = self.db.execute(
+            "SELECT vector, scale FROM magnitude WHERE key = ?", (word,)
+        ).fetchone()
+        if row is None:
+            vector = None
+        else:
+            vector = self._decode_vector(blob=row[0], scale=row[1])
+        with self._cache_lock:
+            self._cache_put(word, vector)
+        return vector
+
+    def get_word_vectors(self, words: List[str]) -> np.ndarray:
+        """Return embedding arrays for all ``words`` in a single
+        matrix of shape ``(len(words), embedding_length)``. Rows
+        for words missing from the store are all zeros.
+        """
+        vector_matrix = np.empty(
+            (len(words), self.get_embedding_length()), dtype=np.float32
+        )
+        self.get_word_vectors_into(words, vector_matrix)
+        return vector_matrix
+
+    def get_word_vectors_into(self, words: List[str], out: np.ndarray) -> None:
+        """Fill the rows of preallocated matrix ``out``, of shape
+        ``(len(words), embedding_length)``, with the embedding of each
+        word. Cached words are served from the LRU cache and the
+        remaining misses fetched with bulk ``SELECT``s of at most
+        ``SQL_SELECT_CHUNK_SIZE`` keys each; rows for words missing
+        from the store are zeroed.
+        """
+        resolved = dict()
+        misses = list()
+        with self._cache_lock:
+            cache = self._vector_cache
+            for word in set(words):
+                if word in cache:
+                    cache.move_to_end(word)
+                    resolved[word] = cache[word]
+                else:
+                    misses.append(word)
+        if misses:
+            found = dict()
+            # query the misses in fixed-size chunks, so the number of
+            # bound variables never exceeds SQLite's per-statement cap
+            for start in range(0, len(misses), SQL_SELECT_CHUNK_SIZE):
+                chunk = misses[start : start + SQL_SELECT_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                for key, blob, scale in self.db.execute(
+                    f"SELECT key, vector, scale FROM magnitude WHERE key IN ({placeholders})",
+                    chunk,
+                ):
+                    found[key] = self._decode_vector(blob=blob, scale=scale)
+            with self._cache_lock:
+                for word in misses:
+                    vector = found.get(word)
+                    resolved[word] = vector
+                    self._cache_put(word, vector)
+        zero_vector = self._get_zero_vector()
+        for index, word in enumerate(words):
+            vector = resolved[word]
+            out[index] = vector if vector is not None else zero_vector
+
+    def get_embedding_length(self) -> int:
+        """Return the embedding length for selected model."""
+        return self._embedding_length
+
+    def _decode_vector(self, blob: bytes, scale: float) -> np.ndarray:
+        """Unpack an int8-quantized BLOB and rescale it to float32."""
+        vector = np.frombuffer(blob, dtype=np.int8).astype(np.float32) * scale
+        vector.flags.writeable = False
+        return vector
+
+    def _get_zero_vector(self) -> np.ndarray:
+        """Return the all-zeros embedding used for words missing
+        from the model. The array is allocated once, marked
+        read-only, and shared by all out-of-vocabulary words.
+        """
+        if self._zero_vector is None:
+            zero_vector = np.zeros(self.get_embedding_length(), dtype=np.float32)
+            zero_vector.flags.writeable = False
+            self._zero_vector = zero_vector
+        return self._zero_vector
+
+    def _cache_put(self, word: str, vector) -> None:
+        """Insert a lookup result (an array, or ``None`` for a miss)
+        into the vector cache, evicting the least recently used entry
+        once the cache is full. The caller must hold ``_cache_lock``.
+        """
+        if len(self._vector_cache) >= VECTOR_CACHE_SIZE:
+            self._vector_cache.popitem(last=False)
+        self._vector_cache[word] = vector
+
+    def cache_clear(self) -> None:
+        """Empty the vector cache, e.g. under memory pressure."""
+        with self._cache_lock:
+            self._vector_cache.clear()
@@ -2,14 +2,81 @@
 that are called by ``Pipeline``s.
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 
 import numpy as np
-from boltons.cacheutils import cachedproperty
 
 from cltkv1.core.data_types import Doc, Process
 from cltkv1.core.exceptions import CLTKException
-from cltkv1.embeddings.embeddings import FastTextEmbeddings, Word2VecEmbeddings
+from cltkv1.embeddings.embeddings import (
+    FastTextEmbeddings,
+    MagnitudeEmbeddings,
+    Word2VecEmbeddings,
+)
+
+
+# batches with fewer words than this are looked up serially, since
+# spinning up a thread pool would cost more than it saves
+_PARALLEL_THRESHOLD = 512
+
+
+def _bulk_word_vectors(embeddings_obj, words):
+    """Fetch the vectors for ``words`` as one ``(len(words),
+    embedding_length)`` matrix. Large batches are split across a
+    thread pool, each worker filling its own slice of the preallocated
+    output -- but only for backends whose ``PARALLEL_LOOKUPS`` flag
+    says their lookups release the interpreter lock (the SQLite-backed
+    store does during queries). The gensim backends hold the lock
+    throughout their id-resolve loop and gather, so threading them
+    would only add pool overhead; they always take the serial path.
+    """
+    count = len(words)
+    if count <= _PARALLEL_THRESHOLD or not getattr(
+        embeddings_obj, "PARALLEL_LOOKUPS", False
+    ):
+        return embeddings_obj.get_word_vectors(words)
+    out = np.empty(
+        (count, embeddings_obj.get_embedding_length()), dtype=np.float32
+    )
+    n_workers = os.cpu_count() or 1
+    chunk_size = -(-count // n_workers)  # ceiling division
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = [
+            executor.submit(
+                embeddings_obj.get_word_vectors_into,
+                words[start : start + chunk_size],
+                out[start : start + chunk_size],
+            )
+            for start in range(0, count, chunk_size)
+        ]
+        for future in futures:
+            future.result()
+    return out
+
+
+@lru_cache(maxsize=8)
+def _load_embeddings_model(variant: str, language: str):
+    """Load an embeddings model, memoized on ``(variant, language)``
+    so that repeated ``Process`` instances (one per document in a
+    pipeline) share a single in-memory model instead of re-reading
+    a multi-gigabyte file from disk for every document. The loaded
+    models are read-only and so safe to share.
+    """
+    valid_variants = ["fasttext", "magnitude", "nlpl"]
+    if variant == "fasttext":
+        return FastTextEmbeddings(iso_code=language)
+    elif variant == "magnitude":
+        return MagnitudeEmbeddings(iso_code=language)
+    elif variant == "nlpl":
+        return Word2VecEmbeddings(iso_code=language)
+    else:
+        valid_variants_str = "', '".join(valid_variants)
+        raise CLTKException(
+            f"Invalid embeddings ``variant`` ``{variant}``. Available: '{valid_variants_str}'."
+        )
 
 
 @dataclass
@@ -19,6 +86,11 @@ class EmbeddingsProcess(Process):
     .. note::
         There can be no ``DefaultEmbeddingsProcess`` because word embeddings are naturally language-specific.
 
+    .. note::
+        With the default ``normalize=True``, stored vectors are unit-norm,
+        so cosine similarity between two embeddings is just their dot
+        product; consumers need not renormalize.
+
     Example: ``EmbeddingsProcess`` <- ``LatinEmbeddingsProcess``
 
     >>> from cltkv1.core.data_types import Doc
@@ -31,191 +103,155 @@ class EmbeddingsProcess(Process):
 
     language: str = None
     variant: str = "fasttext"
-
-    @cachedproperty
+    # dtype in which embeddings are stored on the output ``Doc``;
+    # "float16" halves and "int8" quarters the memory footprint
+    dtype: str = "float32"
+    # L2-normalize stored vectors, so that cosine similarity between
+    # two embeddings reduces to a plain dot product
+    normalize: bool = True
+
+    @cached_property
     def algorithm(self):
-        valid_variants = ["fasttext", "nlpl"]
-        if self.variant == "fasttext":
-            return FastTextEmbeddings(iso_code=self.language)
-        elif self.variant == "nlpl":
-            return Word2VecEmbeddings(iso_code=self.language)
-        else:
-            valid_variants_str = "', '".join(valid_variants)
-            raise CLTKException(
-                f"Invalid embeddings ``variant`` ``{self.variant}``. Available: '{valid_variants_str}'."
-            )
+        return _load_embeddings_model(variant=self.variant, language=self.language)
 
     def run(self):
         tmp_doc = self.input_doc
-        embedding_length = None
-        embeddings_obj = self.algorithm
-        for index, word_obj in enumerate(tmp_doc.words):
-            if not embedding_length:
-                embedding_length = embeddings_obj.get_embedding_length()
-            word_embedding = embeddings_obj.get_word_vector(word=word_obj.string)
-            if not isinstance(word_embedding, np.ndarray):
-                word_embedding = np.zeros([embedding_length])
-            word_obj.embedding = word_embedding
-            tmp_doc.words[index] = word_obj
+        strings = [word_obj.string for word_obj in tmp_doc.words]
+        vector_matrix, scales = self._embed_strings(strings)
+        tmp_doc.embeddings = vector_matrix
+        tmp_doc.embeddings_scales = scales
+        for word_obj, vector in zip(tmp_doc.words, vector_matrix):
+            # a view into the ``Doc.embeddings`` matrix, not a copy
+            word_obj.embedding = vector
         self.output_doc = tmp_doc
 
+    def run_batch(self, docs):
+        """Embed several ``Doc``s at once. The tokens of all documents
+        are concatenated into one bulk lookup, so fixed costs (model
+        load, frame setup, deduplication) are paid once per batch
+        rather than once per document -- the realistic CLTK workload
+        being a whole corpus, not a single text. Each ``Doc`` is
+        annotated in place exactly as ``run`` would, its embedding
+        matrix being a slice view of the batch matrix, and the list is
+        returned for convenience.
+        """
+        strings = list()
+        offsets = [0]
+        for doc in docs:
+            strings.extend(word_obj.string for word_obj in doc.words)
+            offsets.append(len(strings))
+        vector_matrix, scales = self._embed_strings(strings)
+        for index, doc in enumerate(docs):
+            start, stop = offsets[index], offsets[index + 1]
+            doc.embeddings = vector_matrix[start:stop]
+            doc.embeddings_scales = None if scales is None else scales[start:stop]
+            for word_obj, vector in zip(doc.words, doc.embeddings):
+                word_obj.embedding = vector
+        return docs
+
+    def _embed_strings(self, strings):
+        """Return the embedding matrix for a token list, along with
+        the per-row scales when storing as int8 (``None`` otherwise).
+        Natural-language texts are Zipfian, so the same surface forms
+        recur many times; each distinct form is looked up once and the
+        rows then scattered back onto the token positions.
+        """
+        embeddings_obj = self.algorithm
+        unique_strings, inverse = np.unique(
+            np.array(strings, dtype=object), return_inverse=True
+        )
+        unique_vectors = _bulk_word_vectors(embeddings_obj, list(unique_strings))
+        if self.normalize:
+            # one vectorized normalize over the unique rows; the clip
+            # keeps all-zero OOV rows from dividing by zero
+            norms = np.linalg.norm(unique_vectors, axis=1, keepdims=True)
+            unique_vectors /= norms.clip(min=1e-12)
+        vector_matrix = unique_vectors[inverse]
+        return self._convert_dtype(vector_matrix)
+
+    def _convert_dtype(self, vector_matrix):
+        """Convert a float32 embedding matrix to the dtype requested
+        for storage. For ``"int8"``, each row is quantized with its own
+        scale (``max(abs(row)) / 127``) and the per-row scales are
+        returned alongside the matrix; for the other dtypes the second
+        return value is ``None``.
+        """
+        valid_dtypes = ["float32", "float16", "int8"]
+        if self.dtype == "float32":
+            return vector_matrix, None
+        elif self.dtype == "float16":
+            return vector_matrix.astype(np.float16), None
+        elif self.dtype == "int8":
+            scales = np.abs(vector_matrix).max(axis=1) / 127
+            scales = scales.clip(min=1e-12)
+            quantized = np.round(vector_matrix / scales[:, np.newaxis]).astype(np.int8)
+            return quantized, scales
+        else:
+            valid_dtypes_str = "', '".join(valid_dtypes)
+            raise CLTKException(
+                f"Invalid embeddings ``dtype`` ``{self.dtype}``. Available: '{valid_dtypes_str}'."
+            )
 
-@dataclass
-class ArabicEmbeddingsProcess(EmbeddingsProcess):
-    """The default Arabic embeddings algorithm.
-
-    >>> from cltkv1.core.data_types import Doc, Word
-    >>> from cltkv1.embeddings.processes import ArabicEmbeddingsProcess
-    >>> from cltkv1.languages.example_texts import get_example_text
-    >>> language = "arb"
-    >>> example_text = get_example_text(language)
-    >>> tokens = [Word(string=token) for token in example_text.split(" ")]
-    >>> a_process = ArabicEmbeddingsProcess(input_doc=Doc(raw=get_example_text(language), words=tokens))
-    >>> a_process.run()
-    >>> isinstance(a_process.output_doc.words[1].embedding, np.ndarray)
-    True
-    """
-
-    description: str = "Default embeddings for Arabic."
-    language: str = "arb"
-
-
-@dataclass
-class AramaicEmbeddingsProcess(EmbeddingsProcess):
-    """The default Aramaic embeddings algorithm.
-
-    >>> from cltkv1.core.data_types import Doc, Word
-    >>> from cltkv1.embeddings.processes import AramaicEmbeddingsProcess
-    >>> from cltkv1.languages.example_texts import get_example_text
-    >>> language = "arc"
-    >>> example_text = get_example_text(language)
-    >>> tokens = [Word(string=token) for token in example_text.split(" ")]
-    >>> a_process = AramaicEmbeddingsProcess(input_doc=Doc(raw=get_example_text(language), words=tokens))
-    >>> a_process.run()
-    >>> isinstance(a_process.output_doc.words[1].embedding, np.ndarray)
-    True
-    """
-
-    description: str = "Default embeddings for Aramaic."
-    language: str = "arb"
-
-
-@dataclass
-class GothicEmbeddingsProcess(EmbeddingsProcess):
-    """The default Gothic embeddings algorithm.
-
-    >>> from cltkv1.core.data_types import Doc, Word
-    >>> from cltkv1.embeddings.processes import GothicEmbeddingsProcess
-    >>> from cltkv1.languages.example_texts import get_example_text
-    >>> language = "got"
-    >>> example_text = get_example_text(language)
-    >>> tokens = [Word(string=token) for token in example_text.split(" ")]
-    >>> a_process = GothicEmbeddingsProcess(input_doc=Doc(raw=get_example_text(language), words=tokens))
-    >>> a_process.run()
-    >>> isinstance(a_process.output_doc.words[1].embedding, np.ndarray)
-    True
-    """
-
-    description: str = "Default embeddings for Gothic."
-    language: str = "got"
-
-
-@dataclass
-class GreekEmbeddingsProcess(EmbeddingsProcess):
-    """The default Ancient Greek embeddings algorithm.
-
-    >>> from cltkv1.core.data_types import Doc, Word
-    >>> from cltkv1.embeddings.processes import GreekEmbeddingsProcess
-    >>> from cltkv1.languages.example_texts import get_example_text
-    >>> language = "grc"
-    >>> example_text = get_example_text(language)
-    >>> tokens = [Word(string=token) for token in example_text.split(" ")]
-    >>> a_process = GreekEmbeddingsProcess(input_doc=Doc(raw=get_example_text(language), words=tokens))
-    >>> a_process.run()
-    >>> isinstance(a_process.output_doc.words[1].embedding, np.ndarray)
-    True
-    """
-
-    language: str = "grc"
-    description: str = "Default embeddings for Ancient Greek."
-    variant: str = "nlpl"
-
-
-@dataclass
-class LatinEmbeddingsProcess(EmbeddingsProcess):
-    """The default Latin embeddings algorithm.
-
-    >>> from cltkv1.core.data_types import Doc, Word
-    >>> from cltkv1.embeddings.processes import LatinEmbeddingsProcess
-    >>> from cltkv1.languages.example_texts import get_example_text
-    >>> language = "lat"
-    >>> example_text = get_example_text(language)
-    >>> tokens = [Word(string=token) for token in example_text.split(" ")]
-    >>> a_process = LatinEmbeddingsProcess(input_doc=Doc(raw=get_example_text(language), words=tokens))
-    >>> a_process.run()
-    >>> isinstance(a_process.output_doc.words[1].embedding, np.ndarray)
-    True
-    """
-
-    language: str = "lat"
-    description: str = "Default embeddings for Latin."
-
-
-@dataclass
-class OldEnglishEmbeddingsProcess(EmbeddingsProcess):
-    """The default Old English embeddings algorithm.
-
-    >>> from cltkv1.core.data_types import Doc, Word
-    >>> from cltkv1.embeddings.processes import OldEnglishEmbeddingsProcess
-    >>> from cltkv1.languages.example_texts import get_example_text
-    >>> language = "ang"
-    >>> example_text = get_example_text(language)
-    >>> tokens = [Word(string=token) for token in example_text.split(" ")]
-    >>> a_process = OldEnglishEmbeddingsProcess(input_doc=Doc(raw=get_example_text(language), words=tokens))
-    >>> a_process.run()
-    >>> isinstance(a_process.output_doc.words[1].embedding, np.ndarray)
-    True
-    """
-
-    description: str = "Default embeddings for Old English."
-    language: str = "ang"
-
-
-@dataclass
-class PaliEmbeddingsProcess(EmbeddingsProcess):
-    """The default Pali embeddings algorithm.
 
-    >>> from cltkv1.core.data_types import Doc, Word
-    >>> from cltkv1.embeddings.processes import PaliEmbeddingsProcess
-    >>> from cltkv1.languages.example_texts import get_example_text
-    >>> language = "pli"
-    >>> example_text = get_example_text(language)
-    >>> tokens = [Word(string=token) for token in example_text.split(" ")]
-    >>> a_process = PaliEmbeddingsProcess(input_doc=Doc(raw=get_example_text(language), words=tokens))
-    >>> a_process.run()
-    >>> isinstance(a_process.output_doc.words[1].embedding, np.ndarray)
-    True
+# class-name prefix -> (language name, doctest example language,
+# ``language`` field default, ``variant`` field default) for each
+# language's default embeddings
+_EMBEDDINGS_PROCESSES = {
+    "Arabic": ("Arabic", "arb", "arb", "fasttext"),
+    "Aramaic": ("Aramaic", "arc", "arb", "fasttext"),
+    "Gothic": ("Gothic", "got", "got", "fasttext"),
+    "Greek": ("Ancient Greek", "grc", "grc", "nlpl"),
+    "Latin": ("Latin", "lat", "lat", "fasttext"),
+    "OldEnglish": ("Old English", "ang", "ang", "fasttext"),
+    "Pali": ("Pali", "pli", "pli", "fasttext"),
+    "Sanskrit": ("Sanskrit", "san", "san", "fasttext"),
+}
+
+
+def _make_embeddings_process(
+    prefix: str, language_name: str, example_iso: str, iso_code: str, variant: str
+):
+    """Build one language's ``EmbeddingsProcess`` subclass. The
+    subclasses differ only in their default field values, so they are
+    generated from ``_EMBEDDINGS_PROCESSES`` instead of being written
+    out longhand; this also keeps module import cheap.
     """
-
-    description: str = "Default embeddings for Pali."
-    language: str = "pli"
-
-
-@dataclass
-class SanskritEmbeddingsProcess(EmbeddingsProcess):
-    """The default Sanskrit embeddings algorithm.
+    class_name = f"{prefix}EmbeddingsProcess"
+    docstring = f"""The default {language_name} embeddings algorithm.
 
     >>> from cltkv1.core.data_types import Doc, Word
-    >>> from cltkv1.embeddings.processes import SanskritEmbeddingsProcess
+    >>> from cltkv1.embeddings.processes import {class_name}
     >>> from cltkv1.languages.example_texts import get_example_text
-    >>> language = "san"
+    >>> language = "{example_iso}"
     >>> example_text = get_example_text(language)
     >>> tokens = [Word(string=token) for token in example_text.split(" ")]
-    >>> a_process = SanskritEmbeddingsProcess(input_doc=Doc(raw=get_example_text(language), words=tokens))
+    >>> a_process = {class_name}(input_doc=Doc(raw=get_example_text(language), words=tokens))
     >>> a_process.run()
     >>> isinstance(a_process.output_doc.words[1].embedding, np.ndarray)
     True
     """
-
-    description: str = "Default embeddings for Sanskrit."
-    language: str = "san"
+    attributes = {
+        "__doc__": docstring,
+        "__annotations__": {"description": str, "language": str, "variant": str},
+        "description": f"Default embeddings for {language_name}.",
+        "language": iso_code,
+        "variant": variant,
+    }
+    return dataclass(type(class_name, (EmbeddingsProcess,), attributes))
+
+
+for _prefix, (_language_name, _example_iso, _iso_code, _variant) in list(
+    _EMBEDDINGS_PROCESSES.items()
+):
+    _process_class = _make_embeddings_process(
+        prefix=_prefix,
+        language_name=_language_name,
+        example_iso=_example_iso,
+        iso_code=_iso_code,
+        variant=_variant,
+    )
+    globals()[_process_class.__name__] = _process_class
+# clean the loop variables out of the module namespace; doctest
+# collection would otherwise pick up ``_process_class`` as a second
+# alias of the last generated class and run its doctests twice
+del _prefix, _language_name, _example_iso, _iso_code, _variant, _process_class